@@ -1,6 +1,8 @@
 from flask import Flask, jsonify, request, send_from_directory
 from src.analyzer import SpotifyAnalyzer
 from src.visualizer import MusicVisualizer
+from src.rollups import ListeningRollups, TIME_RANGES, FEATURES
+from src.sequencer import PlaylistSequencer
 from src.sorters import bubble_sort, quick_sort, merge_sort
 from dotenv import load_dotenv
 import os
@@ -17,6 +19,12 @@ redirect_uri = os.getenv("SPOTIFY_REDIRECT_URI")
 # Initialize analyzers
 analyzer = SpotifyAnalyzer(client_id, client_secret, redirect_uri)
 visualizer = MusicVisualizer()
+rollups = ListeningRollups(
+    analyzer,
+    limit=50,
+    history_path=os.getenv("ROLLUPS_HISTORY_PATH"),
+    max_snapshots=int(os.getenv("ROLLUPS_MAX_SNAPSHOTS", "100")),
+)
 
 
 @app.route("/")
@@ -36,8 +44,11 @@ def analyze_music():
     visualization_type = data.get("visualizationType", "audioFeatures")
     sort_method = data.get("sortMethod", "popularity")
 
+    # Fetch everything this request needs once, then share it across views
+    context = analyzer.create_context(limit=50).prefetch([visualization_type])
+
     # Get playlist based on mood
-    playlist = analyzer.create_mood_playlist(mood, limit=50)
+    playlist = analyzer.create_mood_playlist(mood, context=context)
     tracks_list = playlist.to_dict("records")
 
     # Apply sorting based on method
@@ -53,7 +64,9 @@ def analyze_music():
     if visualization_type == "audioFeatures":
         visualization_data = analyzer.get_audio_features_data(playlist)
     elif visualization_type == "genreDistribution":
-        visualization_data = analyzer.get_genre_distribution_data(tracks_list)
+        visualization_data = analyzer.get_genre_distribution_data(
+            tracks_list, context=context
+        )
     elif visualization_type == "topSongs":
         visualization_data = analyzer.get_top_songs_data(tracks_list)
 
@@ -65,5 +78,67 @@ def analyze_music():
     )
 
 
+@app.route("/api/sequence", methods=["POST"])
+def sequence_playlist():
+    data = request.json
+    mood = data.get("mood", "happy")
+    if mood not in analyzer.MOOD_PARAMS:
+        return (
+            jsonify({"error": f"Mood must be one of {list(analyzer.MOOD_PARAMS)}"}),
+            400,
+        )
+    try:
+        options = PlaylistSequencer.validate(
+            n=data.get("length", 20),
+            energy_arc=data.get("energyArc", "peak"),
+            max_tempo_jump=data.get("maxTempoJump", 15),
+            artist_spacing=data.get("artistSpacing", 3),
+            target_duration_ms=data.get("targetDurationMs"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Order the mood playlist's tracks against the requested flow constraints,
+    # favouring the tracks that best match the mood
+    context = analyzer.create_context(limit=50)
+    playlist = analyzer.create_mood_playlist(mood, context=context)
+    sequenced = PlaylistSequencer(playlist).build(**options)
+    return jsonify({"tracks": sequenced.to_dict("records")})
+
+
+@app.route("/api/rollups", methods=["POST"])
+def refresh_rollups():
+    # Fetch all time ranges concurrently and store new snapshots
+    return jsonify(rollups.refresh())
+
+
+@app.route("/api/rollups/diff", methods=["GET"])
+def diff_rollups():
+    base_range = request.args.get("from", "long_term")
+    other_range = request.args.get("to", "short_term")
+    if base_range not in TIME_RANGES or other_range not in TIME_RANGES:
+        return jsonify({"error": f"Time range must be one of {TIME_RANGES}"}), 400
+
+    # Served from stored snapshots only, POST /api/rollups takes new ones
+    if rollups.latest(base_range) is None or rollups.latest(other_range) is None:
+        return (
+            jsonify({"error": "No snapshots yet, POST /api/rollups to take them"}),
+            404,
+        )
+    return jsonify(rollups.diff_ranges(base_range, other_range))
+
+
+@app.route("/api/rollups/trend", methods=["GET"])
+def trend_rollups():
+    time_range = request.args.get("range", "medium_term")
+    feature = request.args.get("feature", "energy")
+    if time_range not in TIME_RANGES:
+        return jsonify({"error": f"Time range must be one of {TIME_RANGES}"}), 400
+    if feature not in FEATURES:
+        return jsonify({"error": f"Feature must be one of {FEATURES}"}), 400
+
+    return jsonify(rollups.trend(time_range, feature))
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -1,10 +1,27 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
+import threading
 from dotenv import load_dotenv
 from .sorters import bubble_sort, quick_sort
+from .context import AnalysisContext, primary_artist_id
+
+
+class _SerializedAuthManager:
+    """Auth manager wrapper that lets one thread at a time read or refresh the token"""
+
+    def __init__(self, auth_manager):
+        self._auth_manager = auth_manager
+        self._lock = threading.Lock()
+
+    def get_access_token(self, *args, **kwargs):
+        with self._lock:
+            return self._auth_manager.get_access_token(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._auth_manager, name)
 
 
 class SpotifyAnalyzer:
@@ -23,6 +40,17 @@ class SpotifyAnalyzer:
         sp (spotipy.Spotify): Authenticated Spotify client instance
     """
 
+    # Define mood parameters
+    MOOD_PARAMS = {
+        "happy": {"valence": 0.7, "energy": 0.7},
+        "sad": {"valence": 0.3, "energy": 0.3},
+        "energetic": {"energy": 0.8, "tempo": 120},
+        "chill": {"energy": 0.3, "tempo": 100},
+    }
+
+    # Spread of features not already on a 0..1 scale
+    FEATURE_RANGES = {"tempo": 200.0}
+
     def __init__(self, client_id=None, client_secret=None, redirect_uri=None):
         """
         Initialize Spotify client with authentication
@@ -48,14 +76,16 @@ class SpotifyAnalyzer:
 
         # Initialize Spotify client with auth manager
         try:
-            self.sp = spotipy.Spotify(
-                auth_manager=SpotifyOAuth(
+            # Token access is serialized so clients on other threads can share it
+            self.auth_manager = _SerializedAuthManager(
+                SpotifyOAuth(
                     client_id=self.client_id,
                     client_secret=self.client_secret,
                     redirect_uri=redirect_uri,
                     scope="user-library-read playlist-modify-public user-top-read",
                 )
             )
+            self.sp = spotipy.Spotify(auth_manager=self.auth_manager)
             # Test the connection
             self.sp.current_user()
             print("Successfully connected to Spotify!")
@@ -144,6 +174,7 @@ class SpotifyAnalyzer:
                 "id": track["id"],
                 "name": track["name"],
                 "artist": track["artists"][0]["name"],
+                "artist_id": track["artists"][0]["id"],
                 "popularity": track["popularity"],
                 "duration_ms": track["duration_ms"],
                 "release_date": track["album"]["release_date"],
@@ -156,33 +187,74 @@ class SpotifyAnalyzer:
 
         return pd.DataFrame(track_data)
 
-    def create_mood_playlist(self, mood: str, limit: int = 50) -> pd.DataFrame:
-        """Create a playlist based on mood using audio features"""
-        # Get user's top tracks
-        top_tracks = self.sp.current_user_top_tracks(
-            limit=limit, time_range="medium_term"
-        )
-        track_ids = [track["id"] for track in top_tracks["items"]]
+    def create_client(self) -> spotipy.Spotify:
+        """Create a Spotify client with its own HTTP session for another thread"""
+        return spotipy.Spotify(auth_manager=self.auth_manager)
+
+    def create_context(
+        self,
+        limit: int = 50,
+        time_range: str = "medium_term",
+        sp: Optional[spotipy.Spotify] = None,
+    ) -> AnalysisContext:
+        """Create a request-scoped context that fetches each entity only once"""
+        return AnalysisContext(sp or self.sp, limit=limit, time_range=time_range)
+
+    def create_mood_playlist(
+        self,
+        mood: str,
+        limit: Optional[int] = None,
+        context: Optional[AnalysisContext] = None,
+    ) -> pd.DataFrame:
+        """
+        Create a playlist based on mood using audio features.
 
-        # Get audio features
-        features = self.get_track_features(track_ids)
-        df = self.merge_track_info(top_tracks["items"], features)
+        Args:
+            mood (str): Mood to score tracks against
+            limit (int): Number of top tracks to use, defaults to 50. Must match
+                the context's limit when a context is given.
+            context (AnalysisContext): Request-scoped context to fetch through
 
-        # Define mood parameters
-        mood_params = {
-            "happy": {"valence": 0.7, "energy": 0.7},
-            "sad": {"valence": 0.3, "energy": 0.3},
-            "energetic": {"energy": 0.8, "tempo": 120},
-            "chill": {"energy": 0.3, "tempo": 100},
-        }
+        Returns:
+            pd.DataFrame: Tracks sorted by mood score
+        """
+        if context is None:
+            context = self.create_context(limit=50 if limit is None else limit)
+        elif limit is not None and limit != context.limit:
+            raise ValueError(
+                f"limit={limit} does not match the context's limit={context.limit}"
+            )
+
+        # Get user's top tracks and their audio features
+        top_tracks = context.top_tracks()
+        features = context.track_features([track["id"] for track in top_tracks])
+        df = self.merge_track_info(top_tracks, features)
+
+        return self.score_mood(df, mood)
+
+    def score_mood(
+        self, df: pd.DataFrame, mood: str, normalize: bool = False
+    ) -> pd.DataFrame:
+        """
+        Score tracks by distance to a mood's target features (lower is better).
+
+        Args:
+            df (pd.DataFrame): Merged track/feature DataFrame
+            mood (str): Mood from MOOD_PARAMS
+            normalize (bool): Scale each distance by FEATURE_RANGES so scores
+                are on 0..1 and comparable across moods
 
+        Returns:
+            pd.DataFrame: Tracks sorted by mood score
+        """
         # Filter and sort based on mood
-        if mood in mood_params:
-            for feature, target in mood_params[mood].items():
-                df[f"{feature}_distance"] = abs(df[feature] - target)
+        if mood in self.MOOD_PARAMS and not df.empty:
+            for feature, target in self.MOOD_PARAMS[mood].items():
+                scale = self.FEATURE_RANGES.get(feature, 1.0) if normalize else 1.0
+                df[f"{feature}_distance"] = abs(df[feature] - target) / scale
 
             df["mood_score"] = df[
-                [f"{feature}_distance" for feature in mood_params[mood].keys()]
+                [f"{feature}_distance" for feature in self.MOOD_PARAMS[mood].keys()]
             ].mean(axis=1)
             return df.sort_values("mood_score")
 
@@ -195,47 +267,47 @@ class SpotifyAnalyzer:
 
     def get_audio_features_data(self, playlist) -> Dict[str, float]:
         """Get average audio features for the playlist"""
-        features = self.get_track_features(
-            [track["id"] for track in playlist.to_dict("records")]
-        )
-        if not features:
+        # Features are already merged into the playlist, no need to refetch
+        if playlist.empty:
             return {}
 
         # Calculate average of each feature
-        avg_features = {
-            "energy": sum(f["energy"] for f in features if f) / len(features),
-            "valence": sum(f["valence"] for f in features if f) / len(features),
-            "danceability": sum(f["danceability"] for f in features if f)
-            / len(features),
-        }
-        return avg_features
-
-    def get_genre_distribution_data(self, tracks_list) -> Dict[str, int]:
-        """Get genre distribution data optimized for fewer API calls"""
-        artist_ids = {
-            track["artists"][0]["id"]
-            for track in tracks_list
-            if "artists" in track and track["artists"]
-        }
+        averages = playlist[["energy", "valence", "danceability"]].mean()
+        return {feature: float(value) for feature, value in averages.items()}
+
+    def get_genre_distribution_data(
+        self, tracks_list, context: Optional[AnalysisContext] = None
+    ) -> Dict[str, int]:
+        """Get the top 10 genres for the genre distribution visualization"""
+        genre_counts = self.get_genre_counts(tracks_list, context=context)
+        return dict(list(genre_counts.items())[:10])
+
+    def get_genre_counts(
+        self, tracks_list, context: Optional[AnalysisContext] = None
+    ) -> Dict[str, int]:
+        """Get the count of every genre, optimized for fewer API calls"""
+        if context is None:
+            context = self.create_context()
+
+        artist_ids = list(
+            dict.fromkeys(primary_artist_id(track) for track in tracks_list)
+        )
         genres = []
 
-        # Fetch artist info in batches to reduce API calls
-        for i in range(0, len(artist_ids), 50):
-            batch = list(artist_ids)[i : i + 50]
-            artists_info = self.sp.artists(batch)
-            for artist in artists_info["artists"]:
-                genres.extend(artist.get("genres", []))
+        # Artist info is fetched in batches and cached on the context
+        for artist in context.artists([aid for aid in artist_ids if aid]):
+            genres.extend(artist.get("genres", []))
 
-        # Count the genres and return top 10
-        genre_counts = pd.Series(genres).value_counts().head(10)
-        return genre_counts.to_dict()
+        # Count the genres, most common first
+        genre_counts = pd.Series(genres, dtype=object).value_counts()
+        return {genre: int(count) for genre, count in genre_counts.items()}
 
     def get_top_songs_data(self, tracks_list) -> List[Dict[str, Any]]:
         """Get data for the top songs visualization"""
         return [
             {
                 "name": track["name"],
-                "artist": track["artists"][0]["name"],
+                "artist": track.get("artist") or track["artists"][0]["name"],
                 "popularity": track["popularity"],
             }
             for track in tracks_list
@@ -0,0 +1,96 @@
+from typing import List, Dict, Iterable, Optional, Set
+
+# Entities each visualization needs, including the mood playlist it is built from
+VIEW_REQUIREMENTS = {
+    "audioFeatures": {"top_tracks", "audio_features"},
+    "genreDistribution": {"top_tracks", "audio_features", "artists"},
+    "topSongs": {"top_tracks", "audio_features"},
+}
+
+
+def primary_artist_id(track: Dict) -> Optional[str]:
+    """Get the primary artist ID from a flattened or raw Spotify track"""
+    if "artist_id" in track:
+        return track["artist_id"]
+    if track.get("artists"):
+        return track["artists"][0]["id"]
+    return None
+
+
+class AnalysisContext:
+    """
+    Request-scoped cache of Spotify entities shared by every view of one request.
+
+    Each entity (top tracks, audio features, artists) is fetched at most once,
+    in the largest batches the Spotify API allows, and then reused by the
+    analyzer methods that receive this context.
+
+    Attributes:
+        sp (spotipy.Spotify): Authenticated Spotify client instance
+        limit (int): Number of top tracks to fetch
+        time_range (str): Spotify time range for top tracks
+        calls (int): Number of Spotify API calls made through this context
+    """
+
+    def __init__(self, sp, limit: int = 50, time_range: str = "medium_term"):
+        self.sp = sp
+        self.limit = limit
+        self.time_range = time_range
+        self.calls = 0
+        self._top_tracks = None
+        self._features = {}
+        self._artists = {}
+
+    @staticmethod
+    def plan(views: Iterable[str]) -> Set[str]:
+        """Get the set of entities needed to serve the given views"""
+        needed = set()
+        for view in views:
+            needed |= VIEW_REQUIREMENTS.get(view, set())
+        return needed
+
+    def prefetch(self, views: Iterable[str]) -> "AnalysisContext":
+        """Fetch every entity the given views need, one batched pass per entity"""
+        needed = self.plan(views)
+        if not needed:
+            return self
+
+        tracks = self.top_tracks()
+        if "audio_features" in needed:
+            self.track_features([track["id"] for track in tracks])
+        if "artists" in needed:
+            artist_ids = [primary_artist_id(track) for track in tracks]
+            self.artists([aid for aid in artist_ids if aid])
+        return self
+
+    def top_tracks(self) -> List[Dict]:
+        """Get the user's top tracks, fetching them on first use"""
+        if self._top_tracks is None:
+            response = self.sp.current_user_top_tracks(
+                limit=self.limit, time_range=self.time_range
+            )
+            self.calls += 1
+            self._top_tracks = response["items"]
+        return self._top_tracks
+
+    def track_features(self, track_ids: List[str]) -> List[Optional[Dict]]:
+        """Get audio features for tracks, fetching only ids not seen before"""
+        missing = [tid for tid in dict.fromkeys(track_ids) if tid not in self._features]
+        # Process in batches of 100 (Spotify API limit)
+        for i in range(0, len(missing), 100):
+            batch = missing[i : i + 100]
+            self._features.update(zip(batch, self.sp.audio_features(batch)))
+            self.calls += 1
+        return [self._features[tid] for tid in track_ids]
+
+    def artists(self, artist_ids: List[str]) -> List[Dict]:
+        """Get artist objects, fetching only ids not seen before"""
+        missing = [aid for aid in dict.fromkeys(artist_ids) if aid not in self._artists]
+        # Process in batches of 50 (Spotify API limit)
+        for i in range(0, len(missing), 50):
+            batch = missing[i : i + 50]
+            for artist in self.sp.artists(batch)["artists"]:
+                if artist:
+                    self._artists[artist["id"]] = artist
+            self.calls += 1
+        return [self._artists[aid] for aid in artist_ids if aid in self._artists]
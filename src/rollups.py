@@ -0,0 +1,228 @@
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+
+import pandas as pd
+
+TIME_RANGES = ("short_term", "medium_term", "long_term")
+FEATURES = ("danceability", "energy", "valence", "tempo", "popularity")
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def build_snapshot(
+    analyzer, df: pd.DataFrame, genre_counts: Dict[str, int], time_range: str
+) -> Dict[str, Any]:
+    """
+    Precompute a compact listening-profile snapshot for one time range.
+
+    Args:
+        analyzer (SpotifyAnalyzer): Analyzer used to score moods
+        df (pd.DataFrame): Merged track/feature DataFrame for the time range
+        genre_counts (Dict[str, int]): Count of every genre in the time range
+        time_range (str): Spotify time range the data was fetched for
+
+    Returns:
+        Dict[str, Any]: JSON-serializable snapshot of aggregates
+    """
+    snapshot = {
+        "time_range": time_range,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "track_count": len(df),
+        "track_ids": df["id"].tolist() if not df.empty else [],
+        "means": {},
+        "quantiles": {},
+        "genres": genre_counts,
+        "mood_scores": {},
+        "mood_ranking": [],
+        "top_tracks_by_mood": {},
+    }
+    if df.empty:
+        return snapshot
+
+    for feature in FEATURES:
+        snapshot["means"][feature] = float(df[feature].mean())
+        snapshot["quantiles"][feature] = {
+            str(q): float(v) for q, v in df[feature].quantile(list(QUANTILES)).items()
+        }
+
+    # Rank moods by how closely the range matches them on average, using
+    # normalized distances so tempo-based moods compare fairly with the rest
+    for mood in analyzer.MOOD_PARAMS:
+        scored = analyzer.score_mood(df.copy(), mood, normalize=True)
+        snapshot["mood_scores"][mood] = float(scored["mood_score"].mean())
+        snapshot["top_tracks_by_mood"][mood] = scored["id"].head(10).tolist()
+    snapshot["mood_ranking"] = sorted(
+        snapshot["mood_scores"], key=snapshot["mood_scores"].get
+    )
+    return snapshot
+
+
+class ListeningRollups:
+    """
+    A class for precomputing and comparing listening profiles across time ranges.
+
+    Features:
+    - Concurrent fetching of short, medium and long term top tracks
+    - Compact per-range snapshots of feature means, quantiles, genres and moods
+    - Diff and trend queries served from stored snapshots only
+
+    Attributes:
+        analyzer (SpotifyAnalyzer): Analyzer used to fetch and score tracks
+        limit (int): Number of top tracks to fetch per time range
+        history_path (str): Optional JSON file snapshots are persisted to
+        max_snapshots (int): Number of snapshots kept per time range
+        history (List[Dict]): Snapshots kept so far, oldest first
+    """
+
+    def __init__(
+        self,
+        analyzer,
+        limit: int = 50,
+        history_path: str = None,
+        max_snapshots: int = 100,
+    ):
+        self.analyzer = analyzer
+        self.limit = limit
+        self.history_path = history_path
+        self.max_snapshots = max_snapshots
+        self.history = []
+        self._lock = threading.Lock()
+
+        if history_path and os.path.exists(history_path):
+            with open(history_path) as f:
+                self.history = self._trim(json.load(f))
+
+    def refresh(self) -> Dict[str, Dict]:
+        """Fetch all time ranges concurrently and store a new snapshot for each"""
+        with ThreadPoolExecutor(max_workers=len(TIME_RANGES)) as executor:
+            snapshots = list(executor.map(self._snapshot_range, TIME_RANGES))
+
+        # Concurrent refreshes must not interleave history updates or file writes
+        with self._lock:
+            self.history = self._trim(self.history + snapshots)
+            if self.history_path:
+                self._save()
+
+        return {snapshot["time_range"]: snapshot for snapshot in snapshots}
+
+    def _trim(self, history: List[Dict]) -> List[Dict]:
+        """Keep only the newest max_snapshots snapshots of each time range"""
+        kept = {}
+        trimmed = []
+        for snapshot in reversed(history):
+            time_range = snapshot["time_range"]
+            if kept.get(time_range, 0) < self.max_snapshots:
+                kept[time_range] = kept.get(time_range, 0) + 1
+                trimmed.append(snapshot)
+        return trimmed[::-1]
+
+    def _save(self) -> None:
+        """Write the history atomically so readers never see a partial file"""
+        directory = os.path.dirname(os.path.abspath(self.history_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.history, f)
+            os.replace(tmp_path, self.history_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _snapshot_range(self, time_range: str) -> Dict[str, Any]:
+        """Fetch one time range through its own client and context and summarize it"""
+        # Each worker gets its own HTTP session; token access is serialized
+        # by the analyzer's shared auth manager
+        context = self.analyzer.create_context(
+            limit=self.limit,
+            time_range=time_range,
+            sp=self.analyzer.create_client(),
+        ).prefetch(["genreDistribution"])
+
+        top_tracks = context.top_tracks()
+        features = context.track_features([track["id"] for track in top_tracks])
+        df = self.analyzer.merge_track_info(top_tracks, features)
+        genre_counts = self.analyzer.get_genre_counts(
+            df.to_dict("records"), context=context
+        )
+        return build_snapshot(self.analyzer, df, genre_counts, time_range)
+
+    def snapshots(self, time_range: str) -> List[Dict]:
+        """Get all stored snapshots for a time range, oldest first"""
+        return [s for s in self.history if s["time_range"] == time_range]
+
+    def latest(self, time_range: str) -> Dict[str, Any]:
+        """Get the most recent snapshot for a time range"""
+        snapshots = self.snapshots(time_range)
+        return snapshots[-1] if snapshots else None
+
+    def diff(self, base: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compare two snapshots.
+
+        Args:
+            base (Dict): Snapshot to compare from
+            other (Dict): Snapshot to compare to
+
+        Returns:
+            Dict[str, Any]: Changes from base to other
+        """
+        base_tracks = set(base["track_ids"])
+        other_tracks = set(other["track_ids"])
+        union = base_tracks | other_tracks
+
+        genres = set(base["genres"]) | set(other["genres"])
+        return {
+            "from": {
+                "time_range": base["time_range"],
+                "created_at": base["created_at"],
+            },
+            "to": {
+                "time_range": other["time_range"],
+                "created_at": other["created_at"],
+            },
+            "means": {
+                feature: other["means"][feature] - base["means"][feature]
+                for feature in base["means"]
+                if feature in other["means"]
+            },
+            "medians": {
+                feature: other["quantiles"][feature]["0.5"]
+                - base["quantiles"][feature]["0.5"]
+                for feature in base["quantiles"]
+                if feature in other["quantiles"]
+            },
+            "genres": {
+                genre: other["genres"].get(genre, 0) - base["genres"].get(genre, 0)
+                for genre in genres
+            },
+            "mood_ranking": {
+                "from": base["mood_ranking"],
+                "to": other["mood_ranking"],
+            },
+            "track_overlap": (
+                len(base_tracks & other_tracks) / len(union) if union else 0.0
+            ),
+        }
+
+    def diff_ranges(self, base_range: str, other_range: str) -> Dict[str, Any]:
+        """Compare the latest snapshots of two time ranges"""
+        base = self.latest(base_range)
+        other = self.latest(other_range)
+        if base is None or other is None:
+            raise ValueError(
+                f"No snapshot available for {base_range!r} and {other_range!r}. "
+                "Call refresh() first."
+            )
+        return self.diff(base, other)
+
+    def trend(self, time_range: str, feature: str) -> List[Dict[str, Any]]:
+        """Get a feature's mean across all stored snapshots of a time range"""
+        return [
+            {"created_at": s["created_at"], "value": s["means"][feature]}
+            for s in self.snapshots(time_range)
+            if feature in s["means"]
+        ]
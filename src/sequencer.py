@@ -0,0 +1,340 @@
+from typing import List, Dict, Tuple, Union, Any
+
+import numpy as np
+import pandas as pd
+
+# Target energy at the start, middle and end of the playlist
+ENERGY_ARCS = {
+    "flat": [0.6, 0.6, 0.6],
+    "rise": [0.3, 0.6, 0.9],
+    "fall": [0.9, 0.6, 0.3],
+    "peak": [0.3, 0.9, 0.3],
+    "valley": [0.8, 0.3, 0.8],
+}
+
+# Columns the sequencer reads from the analyzer's DataFrame
+REQUIRED_COLUMNS = ("energy", "tempo", "duration_ms", "artist")
+
+
+class PlaylistSequencer:
+    """
+    A class for picking and ordering tracks against flow constraints.
+
+    Features:
+    - Energy arc following (preset shapes or custom control points)
+    - Maximum tempo jump between consecutive tracks
+    - Minimum spacing between tracks by the same artist
+    - Total duration targeting
+    - Preference for tracks that best match the playlist's mood_score
+    - Beam search over precomputed energy/tempo bucket indexes
+
+    Attributes:
+        df (pd.DataFrame): Track/feature DataFrame from SpotifyAnalyzer
+        energy_bucket_size (float): Width of each energy bucket
+        tempo_bucket_size (float): Width of each tempo bucket in BPM
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        energy_bucket_size: float = 0.1,
+        tempo_bucket_size: float = 10.0,
+    ):
+        self.df = df.reset_index(drop=True)
+        # A user without top tracks yields a DataFrame with no columns at all
+        for column in REQUIRED_COLUMNS:
+            if column not in self.df:
+                self.df[column] = pd.Series(
+                    dtype=object if column == "artist" else float
+                )
+        self.energy_bucket_size = energy_bucket_size
+        self.tempo_bucket_size = tempo_bucket_size
+
+        self.energy = self.df["energy"].to_numpy(dtype=float)
+        self.tempo = self.df["tempo"].to_numpy(dtype=float)
+        self.duration = self.df["duration_ms"].to_numpy(dtype=float)
+        self.artist = pd.factorize(self.df["artist"])[0]
+        # Mood fit as a 0..1 percentile rank, lowest mood_score ranks best
+        if "mood_score" in self.df:
+            self.mood_rank = self.df["mood_score"].rank(pct=True).to_numpy(dtype=float)
+        else:
+            self.mood_rank = np.zeros(len(self.df))
+
+        self._energy_buckets = (self.energy // energy_bucket_size).astype(int)
+        self._tempo_buckets = (self.tempo // tempo_bucket_size).astype(int)
+        self._max_radius = int(np.ceil(1 / energy_bucket_size)) + 1
+        self.index = self._build_index()
+
+    def _build_index(self) -> Dict[int, Dict[int, np.ndarray]]:
+        """Group row positions by energy bucket, then by tempo bucket"""
+        index = {}
+        order = np.lexsort((self._tempo_buckets, self._energy_buckets))
+        keys = np.stack(
+            [self._energy_buckets[order], self._tempo_buckets[order]], axis=1
+        )
+        boundaries = np.flatnonzero(np.any(np.diff(keys, axis=0), axis=1)) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                e, t = self._energy_buckets[group[0]], self._tempo_buckets[group[0]]
+                index.setdefault(int(e), {})[int(t)] = group
+        return index
+
+    def _candidates(
+        self,
+        target_energy: float,
+        last_tempo: float,
+        max_tempo_jump: float,
+        radius: int,
+    ) -> np.ndarray:
+        """Get row positions near the target energy and within the tempo jump"""
+        center = int(target_energy // self.energy_bucket_size)
+        if last_tempo is None:
+            low = high = None
+        else:
+            low = int((last_tempo - max_tempo_jump) // self.tempo_bucket_size)
+            high = int((last_tempo + max_tempo_jump) // self.tempo_bucket_size)
+
+        groups = []
+        for e in range(center - radius, center + radius + 1):
+            tempo_index = self.index.get(e)
+            if not tempo_index:
+                continue
+            if low is None:
+                groups.extend(tempo_index.values())
+            else:
+                groups.extend(
+                    tempo_index[t] for t in range(low, high + 1) if t in tempo_index
+                )
+        if not groups:
+            return np.empty(0, dtype=int)
+
+        candidates = np.concatenate(groups)
+        if last_tempo is not None:
+            jumps = np.abs(self.tempo[candidates] - last_tempo)
+            candidates = candidates[jumps <= max_tempo_jump]
+        return candidates
+
+    @staticmethod
+    def validate(
+        n: Any,
+        energy_arc: Any,
+        max_tempo_jump: Any,
+        artist_spacing: Any,
+        target_duration_ms: Any = None,
+    ) -> Dict[str, Any]:
+        """
+        Coerce and check sequencing options, e.g. from a JSON request.
+
+        Args:
+            n (Any): Number of tracks, a non-negative integer
+            energy_arc (Any): Preset name or non-empty list of energies in 0..1
+            max_tempo_jump (Any): Non-negative BPM limit
+            artist_spacing (Any): Non-negative number of tracks
+            target_duration_ms (Any): Positive duration, or None for no target
+
+        Returns:
+            Dict[str, Any]: Keyword arguments for build()
+
+        Raises:
+            ValueError: If any option is missing, malformed or out of range
+        """
+
+        def number(value, name, cast, positive=False):
+            if isinstance(value, bool):
+                raise ValueError(f"{name} must be a number")
+            try:
+                value = cast(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number")
+            if not np.isfinite(value) or value < 0 or (positive and value == 0):
+                kind = "positive" if positive else "non-negative"
+                raise ValueError(f"{name} must be a {kind} number")
+            return value
+
+        if isinstance(energy_arc, str):
+            if energy_arc not in ENERGY_ARCS:
+                raise ValueError(f"Energy arc must be one of {list(ENERGY_ARCS)}")
+        elif (
+            not isinstance(energy_arc, list)
+            or not energy_arc
+            or not all(
+                isinstance(p, (int, float)) and not isinstance(p, bool) and 0 <= p <= 1
+                for p in energy_arc
+            )
+        ):
+            raise ValueError("Energy arc must be a non-empty list of numbers in 0..1")
+
+        options = {
+            "n": number(n, "length", int),
+            "energy_arc": energy_arc,
+            "max_tempo_jump": number(max_tempo_jump, "maxTempoJump", float),
+            "artist_spacing": number(artist_spacing, "artistSpacing", int),
+            "target_duration_ms": None,
+        }
+        if target_duration_ms is not None:
+            options["target_duration_ms"] = number(
+                target_duration_ms, "targetDurationMs", float, positive=True
+            )
+        return options
+
+    @staticmethod
+    def energy_targets(arc: Union[str, List[float]], n: int) -> np.ndarray:
+        """Interpolate an energy arc into one target per playlist position"""
+        points = ENERGY_ARCS[arc] if isinstance(arc, str) else arc
+        if n == 0:
+            return np.empty(0)
+        if n == 1:
+            return np.array([points[0]], dtype=float)
+        return np.interp(np.linspace(0, 1, n), np.linspace(0, 1, len(points)), points)
+
+    def build(
+        self,
+        n: int = 20,
+        energy_arc: Union[str, List[float]] = "peak",
+        max_tempo_jump: float = 15.0,
+        artist_spacing: int = 3,
+        target_duration_ms: float = None,
+        mood_weight: float = 0.5,
+        beam_width: int = 8,
+        branching: int = 8,
+    ) -> pd.DataFrame:
+        """
+        Pick and order tracks that follow the given constraints.
+
+        Args:
+            n (int): Number of tracks in the playlist
+            energy_arc (str | List[float]): Preset from ENERGY_ARCS or control points
+            max_tempo_jump (float): Maximum BPM change between consecutive tracks
+            artist_spacing (int): Minimum number of tracks between the same artist
+            target_duration_ms (float): Desired total playlist length, if any
+            mood_weight (float): Weight of the mood_score rank in each pick
+            beam_width (int): Number of partial playlists kept at each step
+            branching (int): Number of next tracks tried per partial playlist
+
+        Returns:
+            pd.DataFrame: Ordered tracks with position, target_energy,
+                tempo_limit_exceeded and artist_spacing_violated columns. The
+                limits are only broken when no remaining track satisfies them.
+
+        Raises:
+            ValueError: If an option is invalid, see validate()
+        """
+        options = self.validate(
+            n, energy_arc, max_tempo_jump, artist_spacing, target_duration_ms
+        )
+        n = min(options["n"], len(self.df))
+        max_tempo_jump = options["max_tempo_jump"]
+        artist_spacing = options["artist_spacing"]
+        target_duration_ms = options["target_duration_ms"]
+
+        targets = self.energy_targets(energy_arc, n)
+        # Each beam: (cost, sequence, total duration)
+        beams: List[Tuple[float, List[int], float]] = [(0.0, [], 0.0)]
+
+        for position in range(n):
+            expanded = []
+            for cost, sequence, total in beams:
+                picks, step_costs = self._expand(
+                    sequence,
+                    total,
+                    targets[position],
+                    n - position,
+                    max_tempo_jump,
+                    artist_spacing,
+                    target_duration_ms,
+                    mood_weight,
+                    branching,
+                )
+                for pick, step_cost in zip(picks, step_costs):
+                    expanded.append(
+                        (
+                            cost + step_cost,
+                            sequence + [int(pick)],
+                            total + self.duration[pick],
+                        )
+                    )
+            if not expanded:
+                break
+            expanded.sort(key=lambda beam: beam[0])
+            beams = expanded[:beam_width]
+
+        sequence = beams[0][1]
+        result = self.df.iloc[sequence].copy()
+        result["position"] = range(1, len(sequence) + 1)
+        result["target_energy"] = targets[: len(sequence)]
+
+        # Flag picks where no remaining track could satisfy a constraint
+        jumps = np.abs(np.diff(self.tempo[sequence], prepend=np.nan))
+        result["tempo_limit_exceeded"] = jumps > max_tempo_jump
+        artists = self.artist[sequence]
+        result["artist_spacing_violated"] = [
+            artist_spacing > 0 and artists[i] in artists[max(0, i - artist_spacing) : i]
+            for i in range(len(sequence))
+        ]
+        return result
+
+    def _expand(
+        self,
+        sequence: List[int],
+        total: float,
+        target_energy: float,
+        remaining: int,
+        max_tempo_jump: float,
+        artist_spacing: int,
+        target_duration_ms: float,
+        mood_weight: float,
+        branching: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the cheapest next tracks for one partial playlist"""
+        last_tempo = self.tempo[sequence[-1]] if sequence else None
+        recent_artists = (
+            self.artist[sequence[-artist_spacing:]] if artist_spacing else []
+        )
+        used = np.array(sequence, dtype=int)
+
+        def unused(candidates, spaced):
+            candidates = candidates[~np.isin(candidates, used)]
+            if spaced:
+                candidates = candidates[
+                    ~np.isin(self.artist[candidates], recent_artists)
+                ]
+            return candidates
+
+        # Widen the energy search until enough tracks satisfy every constraint,
+        # but keep fewer than branching rather than break the tempo limit
+        widest = self._max_radius
+        for radius in (1, 3, widest):
+            candidates = unused(
+                self._candidates(target_energy, last_tempo, max_tempo_jump, radius),
+                spaced=True,
+            )
+            if len(candidates) >= branching:
+                break
+        # Only when nothing fits, relax artist spacing first, then the tempo limit
+        if not len(candidates):
+            candidates = unused(
+                self._candidates(target_energy, last_tempo, max_tempo_jump, widest),
+                spaced=False,
+            )
+        if not len(candidates):
+            candidates = unused(
+                self._candidates(target_energy, None, max_tempo_jump, widest),
+                spaced=True,
+            )
+        if not len(candidates):
+            candidates = unused(np.arange(len(self.df)), spaced=False)
+
+        costs = np.abs(self.energy[candidates] - target_energy)
+        costs += mood_weight * self.mood_rank[candidates]
+        if last_tempo is not None:
+            jumps = np.abs(self.tempo[candidates] - last_tempo)
+            costs += 0.1 * jumps / max(max_tempo_jump, 1.0)
+            costs += np.where(jumps > max_tempo_jump, 1.0, 0.0)
+        if target_duration_ms is not None:
+            ideal = max(target_duration_ms - total, 0.0) / remaining
+            costs += np.abs(self.duration[candidates] - ideal) / max(ideal, 60000.0)
+
+        if len(candidates) > branching:
+            best = np.argpartition(costs, branching)[:branching]
+            candidates, costs = candidates[best], costs[best]
+        return candidates, costs
@@ -0,0 +1,152 @@
+import importlib
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import spotipy
+
+from src.analyzer import SpotifyAnalyzer, _SerializedAuthManager
+
+
+class FakeSpotify:
+    """In-memory Spotify Web API backend that records every API call"""
+
+    def __init__(self, n_tracks: int = 50, n_artists: int = 7, n_genres: int = 3):
+        self.n_tracks = n_tracks
+        self.n_artists = n_artists
+        self.n_genres = n_genres
+        self.log = []
+        self.clients = []
+
+    def count(self, method: str) -> int:
+        return sum(1 for name, _ in self.log if name == method)
+
+    def current_user_top_tracks(self, limit=20, time_range="medium_term"):
+        self.log.append(("current_user_top_tracks", time_range))
+        rng = random.Random(time_range)
+        prefix = time_range.split("_")[0]
+        items = [
+            {
+                "id": f"{prefix}{i}",
+                "name": f"Track {i}",
+                "artists": [
+                    {
+                        "id": f"artist{i % self.n_artists}",
+                        "name": f"Artist {i % self.n_artists}",
+                    }
+                ],
+                "popularity": rng.randint(0, 100),
+                "duration_ms": rng.randint(120000, 300000),
+                "album": {"release_date": "2020-01-01"},
+            }
+            for i in range(self.n_tracks)
+        ]
+        return {"items": items[:limit]}
+
+    def audio_features(self, ids):
+        self.log.append(("audio_features", len(ids)))
+        features = []
+        for track_id in ids:
+            rng = random.Random(track_id)
+            features.append(
+                {
+                    "id": track_id,
+                    "danceability": rng.random(),
+                    "energy": rng.random(),
+                    "valence": rng.random(),
+                    "tempo": rng.uniform(60, 180),
+                }
+            )
+        return features
+
+    def artists(self, ids):
+        self.log.append(("artists", len(ids)))
+        return {
+            "artists": [
+                {
+                    "id": artist_id,
+                    "genres": [
+                        f"genre-{(int(artist_id[len('artist'):]) + k) % self.n_genres}"
+                        for k in range(2)
+                    ],
+                }
+                for artist_id in ids
+            ]
+        }
+
+    def handle(self, client, url, params):
+        """Answer a spotipy request the way the Web API would"""
+        self.clients.append(client)
+        # Every real request reads the token through the client's auth manager
+        client._auth_headers()
+        path, query = url.split("?")[0].rstrip("/"), parse_qs(urlparse(url).query)
+        if path == "me/top/tracks":
+            return self.current_user_top_tracks(
+                limit=params["limit"], time_range=params["time_range"]
+            )
+        if path == "audio-features":
+            return {"audio_features": self.audio_features(query["ids"][0].split(","))}
+        if path == "artists":
+            return self.artists(query["ids"][0].split(","))
+        raise NotImplementedError(url)
+
+
+class FakeAuthManager:
+    """Auth manager that records how many threads read the token at once"""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_access_token(self, as_dict=True):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        # Widen the window in which unserialized refreshes would overlap
+        time.sleep(0.001)
+        with self._lock:
+            self.active -= 1
+        return "token"
+
+
+@pytest.fixture
+def fake_sp(monkeypatch):
+    fake = FakeSpotify()
+
+    def internal_call(self, method, url, payload, params):
+        return fake.handle(self, url, params)
+
+    monkeypatch.setattr(spotipy.Spotify, "_internal_call", internal_call)
+    return fake
+
+
+@pytest.fixture
+def fake_auth():
+    return FakeAuthManager()
+
+
+@pytest.fixture
+def analyzer(fake_sp, fake_auth):
+    # Skip OAuth and connection checks, real clients talk to the fake backend
+    analyzer = SpotifyAnalyzer.__new__(SpotifyAnalyzer)
+    analyzer.auth_manager = _SerializedAuthManager(fake_auth)
+    analyzer.sp = analyzer.create_client()
+    return analyzer
+
+
+@pytest.fixture
+def client(monkeypatch, analyzer):
+    def fake_init(self, *args, **kwargs):
+        self.auth_manager = analyzer.auth_manager
+        self.sp = analyzer.sp
+
+    monkeypatch.setattr(SpotifyAnalyzer, "__init__", fake_init)
+    server = importlib.import_module("server")
+    monkeypatch.setattr(server.analyzer, "auth_manager", analyzer.auth_manager)
+    monkeypatch.setattr(server.analyzer, "sp", analyzer.sp)
+    return server.app.test_client()
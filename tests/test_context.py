@@ -0,0 +1,58 @@
+import pytest
+
+from src.context import AnalysisContext, primary_artist_id
+
+
+@pytest.mark.parametrize(
+    "visualization_type, artist_calls",
+    [("audioFeatures", 0), ("genreDistribution", 1), ("topSongs", 0)],
+)
+def test_analyze_fetches_each_entity_once(
+    client, fake_sp, visualization_type, artist_calls
+):
+    response = client.post(
+        "/api/analyze",
+        json={"mood": "happy", "visualizationType": visualization_type},
+    )
+
+    assert response.status_code == 200
+    assert fake_sp.count("current_user_top_tracks") == 1
+    assert fake_sp.count("audio_features") == 1
+    assert fake_sp.count("artists") == artist_calls
+
+
+def test_context_counts_calls_and_reuses_cache(analyzer, fake_sp):
+    context = analyzer.create_context(limit=50).prefetch(["genreDistribution"])
+    assert context.calls == 3
+
+    playlist = analyzer.create_mood_playlist("happy", context=context)
+    analyzer.get_genre_distribution_data(playlist.to_dict("records"), context)
+
+    assert context.calls == 3
+    assert len(fake_sp.log) == 3
+
+
+def test_create_mood_playlist_rejects_mismatched_limit(analyzer):
+    context = analyzer.create_context(limit=20)
+
+    with pytest.raises(ValueError):
+        analyzer.create_mood_playlist("happy", limit=50, context=context)
+    assert len(analyzer.create_mood_playlist("happy", context=context)) == 20
+
+
+def test_plan_reads_only_the_view_table():
+    assert AnalysisContext.plan(["topSongs"]) == {"top_tracks", "audio_features"}
+    assert "artists" in AnalysisContext.plan(["audioFeatures", "genreDistribution"])
+    assert AnalysisContext.plan(["unknownView"]) == set()
+
+
+@pytest.mark.parametrize(
+    "track, expected",
+    [
+        ({"artist_id": "flat"}, "flat"),
+        ({"artists": [{"id": "raw"}]}, "raw"),
+        ({"artists": []}, None),
+    ],
+)
+def test_primary_artist_id(track, expected):
+    assert primary_artist_id(track) == expected
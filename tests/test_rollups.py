@@ -0,0 +1,108 @@
+import json
+import threading
+
+import pandas as pd
+import pytest
+import spotipy
+
+from src.rollups import TIME_RANGES, ListeningRollups, build_snapshot
+
+
+def test_refresh_uses_a_client_per_range_sharing_one_auth_manager(
+    analyzer, fake_sp, fake_auth
+):
+    snapshots = ListeningRollups(analyzer).refresh()
+
+    assert set(snapshots) == set(TIME_RANGES)
+    fetched = sorted(
+        arg for name, arg in fake_sp.log if name == "current_user_top_tracks"
+    )
+    assert fetched == sorted(TIME_RANGES)
+
+    clients = {id(c): c for c in fake_sp.clients}.values()
+    assert len(clients) == len(TIME_RANGES)
+    assert all(isinstance(c, spotipy.Spotify) for c in clients)
+    assert all(c.auth_manager is analyzer.auth_manager for c in clients)
+    assert len({id(c._session) for c in clients}) == len(TIME_RANGES)
+
+    # Every request read the token, never two threads at once
+    assert fake_auth.calls == len(fake_sp.log)
+    assert fake_auth.max_active == 1
+
+
+def test_snapshot_keeps_every_genre(analyzer, fake_sp):
+    fake_sp.n_artists = 14
+    fake_sp.n_genres = 14
+    rollups = ListeningRollups(analyzer)
+    rollups.refresh()
+
+    snapshot = rollups.latest("medium_term")
+    assert len(snapshot["genres"]) == 14
+
+    diff = rollups.diff(snapshot, snapshot)
+    assert set(diff["genres"].values()) == {0}
+
+
+def test_mood_ranking_compares_normalized_scores(analyzer):
+    # Fast, loud and gloomy: clearly energetic rather than happy
+    df = pd.DataFrame(
+        {
+            "id": ["a", "b"],
+            "danceability": [0.5, 0.5],
+            "energy": [0.8, 0.8],
+            "valence": [0.1, 0.1],
+            "tempo": [125.0, 118.0],
+            "popularity": [50, 60],
+        }
+    )
+    snapshot = build_snapshot(analyzer, df, {}, "short_term")
+
+    assert snapshot["mood_ranking"][0] == "energetic"
+    assert all(0 <= score <= 1 for score in snapshot["mood_scores"].values())
+
+
+def test_history_persists_and_serves_trends(analyzer, tmp_path):
+    path = tmp_path / "history.json"
+    ListeningRollups(analyzer, history_path=str(path)).refresh()
+    rollups = ListeningRollups(analyzer, history_path=str(path))
+    rollups.refresh()
+
+    assert len(rollups.trend("long_term", "energy")) == 2
+    assert rollups.diff_ranges("long_term", "short_term")["track_overlap"] == 0.0
+
+
+def test_history_is_trimmed_and_written_atomically(analyzer, tmp_path):
+    path = tmp_path / "history.json"
+    rollups = ListeningRollups(analyzer, history_path=str(path), max_snapshots=2)
+
+    threads = [threading.Thread(target=rollups.refresh) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = json.loads(path.read_text())
+    assert len(saved) == len(rollups.history) == 2 * len(TIME_RANGES)
+    assert len(rollups.trend("short_term", "energy")) == 2
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_diff_ranges_requires_snapshots(analyzer):
+    with pytest.raises(ValueError):
+        ListeningRollups(analyzer).diff_ranges("long_term", "short_term")
+
+
+@pytest.mark.parametrize(
+    "query", ["range=medium&feature=energy", "range=medium_term&feature=tempo_x"]
+)
+def test_trend_endpoint_rejects_unknown_range_or_feature(client, query):
+    response = client.get(f"/api/rollups/trend?{query}")
+
+    assert response.status_code == 400
+
+
+def test_diff_endpoint_does_not_refresh_without_snapshots(client, fake_sp):
+    response = client.get("/api/rollups/diff?from=long_term&to=short_term")
+
+    assert response.status_code == 404
+    assert fake_sp.log == []
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.sequencer import PlaylistSequencer
+
+
+def make_tracks(n: int, seed: int = 0, n_artists: int = 200) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": [f"t{i}" for i in range(n)],
+            "artist": [f"a{i}" for i in rng.integers(0, n_artists, n)],
+            "energy": rng.random(n),
+            "tempo": rng.uniform(60, 190, n),
+            "duration_ms": rng.integers(120000, 360000, n),
+        }
+    )
+
+
+def test_build_respects_constraints():
+    sequenced = PlaylistSequencer(make_tracks(2000)).build(
+        n=30, energy_arc="rise", max_tempo_jump=8, artist_spacing=4
+    )
+
+    assert len(sequenced) == 30
+    assert sequenced["id"].is_unique
+    assert sequenced["tempo"].diff().abs().max() <= 8
+    artists = sequenced["artist"].tolist()
+    for i, artist in enumerate(artists):
+        assert artist not in artists[max(0, i - 4) : i]
+    assert np.abs(sequenced["energy"] - sequenced["target_energy"]).mean() < 0.1
+
+
+def test_build_prefers_tracks_matching_mood(analyzer):
+    for mood in analyzer.MOOD_PARAMS:
+        sequencer = PlaylistSequencer(analyzer.create_mood_playlist(mood))
+        with_mood = sequencer.build(n=20, mood_weight=0.5)
+        without_mood = sequencer.build(n=20, mood_weight=0)
+
+        assert with_mood["mood_score"].mean() < without_mood["mood_score"].mean()
+
+
+def test_build_keeps_the_only_track_within_the_tempo_limit():
+    # Greedy from A: only B is within 15 BPM, but it misses the energy target
+    # and has the worst mood score, while C..J are close to every other cost
+    df = pd.DataFrame(
+        {
+            "id": ["A", "B"] + [f"C{i}" for i in range(8)],
+            "artist": [f"a{i}" for i in range(10)],
+            "energy": [0.0, 0.0] + [1.0] * 8,
+            "tempo": [100.0, 110.0] + [120.0 + i for i in range(8)],
+            "duration_ms": [200000] * 10,
+            "mood_score": [0.0, 1.0] + [0.5] * 8,
+        }
+    )
+    sequenced = PlaylistSequencer(df).build(
+        n=2, energy_arc=[0.0, 1.0], max_tempo_jump=15, artist_spacing=0, beam_width=1
+    )
+
+    assert sequenced["id"].tolist() == ["A", "B"]
+    assert not sequenced["tempo_limit_exceeded"].any()
+
+
+def test_build_flags_unavoidable_tempo_jumps():
+    df = make_tracks(2)
+    df["tempo"] = [80.0, 160.0]
+    sequenced = PlaylistSequencer(df).build(n=2, max_tempo_jump=10)
+
+    assert sequenced["tempo_limit_exceeded"].tolist() == [False, True]
+
+
+@pytest.mark.parametrize("df", [pd.DataFrame([]), make_tracks(0)])
+def test_build_handles_empty_input(df):
+    sequenced = PlaylistSequencer(df).build(n=10)
+
+    assert sequenced.empty
+    columns = {
+        "position",
+        "target_energy",
+        "tempo_limit_exceeded",
+        "artist_spacing_violated",
+    }
+    assert columns <= set(sequenced.columns)
+    assert columns <= set(PlaylistSequencer(make_tracks(5)).build(n=0).columns)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"length": "twenty"},
+        {"energyArc": []},
+        {"energyArc": ["high"]},
+        {"energyArc": "zigzag"},
+        {"maxTempoJump": -5},
+        {"artistSpacing": None},
+        {"targetDurationMs": 0},
+        {"mood": "angry"},
+    ],
+)
+def test_sequence_endpoint_rejects_invalid_options(client, body):
+    assert client.post("/api/sequence", json=body).status_code == 400
+
+
+def test_sequence_endpoint_coerces_numeric_strings(client):
+    response = client.post("/api/sequence", json={"length": "12", "maxTempoJump": "20"})
+
+    assert response.status_code == 200
+    assert len(response.get_json()["tracks"]) == 12